@@ -9,10 +9,17 @@ Provides 5 tools for managing a GitHub-backed knowledge base:
   - list_entries: Browse specific sections
 """
 
+import asyncio
+import base64
 import os
+import re
+import time
+from collections.abc import Callable, Hashable
 from datetime import datetime, timezone
+from functools import partial, wraps
 
-from github import Github, GithubException
+import httpx
+from cachetools import TTLCache
 from mcp.server.fastmcp import FastMCP
 from slugify import slugify
 
@@ -28,8 +35,44 @@ if not GITHUB_TOKEN:
 
 GITHUB_REPO = os.environ.get("GITHUB_REPO", "pdawson1983/dawson-pkb")
 
-_gh = Github(GITHUB_TOKEN)
-_repo = _gh.get_repo(GITHUB_REPO)
+# Upper bound on pooled connections and on GitHub requests in flight, sized
+# for the concurrent fan-out in search_pkb and list_entries.
+_POOL_SIZE = 32
+
+# Shared async client for all GitHub API calls. Creating it opens no
+# connections, so the server can start serving stdio immediately.
+_gh_client = httpx.AsyncClient(
+    base_url="https://api.github.com",
+    headers={
+        "Authorization": f"token {GITHUB_TOKEN}",
+        "Accept": "application/vnd.github+json",
+    },
+    http2=True,
+    limits=httpx.Limits(max_connections=_POOL_SIZE),
+    timeout=30,
+)
+_request_slots = asyncio.Semaphore(_POOL_SIZE)
+
+# Transient gateway errors worth retrying for idempotent reads
+_RETRY_STATUSES = {502, 503, 504}
+_MAX_ATTEMPTS = 3
+
+# Longest rate-limit back-off (in seconds) worth waiting out before giving up
+_MAX_RATE_LIMIT_WAIT = 60
+
+
+class GithubException(Exception):
+    """An error response from the GitHub API.
+
+    ``status`` is the HTTP status code and ``data`` the decoded error body.
+    """
+
+    def __init__(self, status: int, data: dict, headers: dict[str, str]):
+        super().__init__(f"{status} {data.get('message', '')}".strip())
+        self.status = status
+        self.data = data
+        self.headers = headers
+
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -39,16 +82,152 @@ VALID_PROMPT_CATEGORIES = {"coding", "infrastructure", "documentation", "general
 VALID_PATTERN_CATEGORIES = {"agent", "cloud", "devops"}
 VALID_SECTIONS = {"til", "prompts", "patterns", "all"}
 
+# Pre-rendered choice lists for validation error messages
+_VALID_PROMPT_CATS_STR = ", ".join(sorted(VALID_PROMPT_CATEGORIES))
+_VALID_PATTERN_CATS_STR = ", ".join(sorted(VALID_PATTERN_CATEGORIES))
+_VALID_SECTIONS_STR = ", ".join(sorted(VALID_SECTIONS))
+
+# Cap on search hits to keep output manageable
+MAX_SEARCH_RESULTS = 20
+
 SECTION_PATH_MAP = {
     "til": "til/",
     "prompts": "ai/prompts/",
     "patterns": "patterns/",
 }
 
+# Frontmatter / body templates for new entries, filled with str.format_map
+_TIL_FM = '---\ntitle: "{title}"\ndate: {date}\ntags: [{tags}]\n---\n\n'
+_PROMPT_FM = (
+    '---\nname: "{name}"\ncategory: {category}\n'
+    'description: "{description}"\ndate: {date}\n---\n\n'
+)
+_PATTERN_FM = (
+    '---\nname: "{name}"\ncategory: {category}\ndate: {date}\n'
+    "tags: [{tags}]\n---\n\n"
+)
+_PATTERN_BODY = "## Problem\n\n{problem}\n\n## Solution\n\n{solution}\n"
+
+
+# Short-lived in-process cache for repo reads. Keys are (dir, "dir") for
+# directory listings, (path, "commits") for last-modified dates and
+# _TREE_CACHE_KEY for the full branch tree. Writes invalidate the affected
+# entries.
+_cache: TTLCache = TTLCache(maxsize=512, ttl=60)
+_TREE_CACHE_KEY = ("main", "tree")
+
+# Lookups currently being fetched, so concurrent misses share one request
+_inflight: dict[Hashable, asyncio.Task] = {}
+
+# Bumped on every invalidation so fetches that started before a write don't
+# store what they read afterwards
+_cache_generation = 0
+
+
+def _forget_inflight(cache_key: Hashable, task: asyncio.Task) -> None:
+    # Only clear the slot if an invalidation hasn't already replaced it
+    if _inflight.get(cache_key) is task:
+        del _inflight[cache_key]
+
+
+def _cached(key: Callable[..., Hashable]):
+    """Cache a coroutine function's results in _cache under key(*args).
+
+    Concurrent callers that miss on the same key await a single shared call.
+    Exceptions are not cached, and neither are results of calls that were in
+    flight when the cache was invalidated.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args):
+            cache_key = key(*args)
+            try:
+                return _cache[cache_key]
+            except KeyError:
+                pass
+
+            generation = _cache_generation
+            task = _inflight.get(cache_key)
+            if task is None:
+                task = asyncio.ensure_future(func(*args))
+                _inflight[cache_key] = task
+                task.add_done_callback(partial(_forget_inflight, cache_key))
+            # Shield so one cancelled caller doesn't cancel the shared fetch
+            value = await asyncio.shield(task)
+            if generation == _cache_generation:
+                _cache[cache_key] = value
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def _invalidate_cached(path: str) -> None:
+    """Drop cached reads for a file and the listings of its parent directories.
+
+    Matching in-flight fetches are detached too, so later callers start a
+    fresh request instead of joining one that may predate the write.
+    """
+    global _cache_generation
+    _cache_generation += 1
+    keys = [(path, "commits"), _TREE_CACHE_KEY]
+    parent = path
+    while "/" in parent:
+        parent = parent.rsplit("/", 1)[0]
+        keys.append((parent, "dir"))
+    for k in keys:
+        _cache.pop(k, None)
+        _inflight.pop(k, None)
+
+
+# Last seen (ETag, body) per file path, used to revalidate files with
+# conditional GETs. 304 responses carry no body and don't count against the
+# primary rate limit.
+_etag_store: dict[str, tuple[str, bytes]] = {}
+
+# Last known blob SHA per file path, recorded from Contents API writes so
+# later updates can be sent without first probing for the current SHA.
+_sha_cache: dict[str, str] = {}
+
+
+def _remember_sha(path: str, sha: str | None) -> None:
+    """Record (or forget, when sha is None) the current blob SHA for a path."""
+    if sha is None:
+        _sha_cache.pop(path, None)
+    else:
+        _sha_cache[path] = sha
+
+
+# Single-entry cache of {UTC day number: "YYYY-MM-DD"}
+_today_cache: dict[int, str] = {}
+
 
 def _today() -> str:
     """Return today's date as YYYY-MM-DD in UTC."""
-    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    day = int(time.time() // 86400)
+    date_str = _today_cache.get(day)
+    if date_str is None:
+        date_str = datetime.fromtimestamp(day * 86400, timezone.utc).strftime(
+            "%Y-%m-%d"
+        )
+        _today_cache.clear()
+        _today_cache[day] = date_str
+    return date_str
+
+
+# Titles made only of these characters slugify to the same result as
+# python-slugify with a single regex substitution.
+_SLUG_SAFE_RE = re.compile(r"[A-Za-z0-9 _.:;!?()/-]*")
+_SLUG_SEPARATOR_RE = re.compile(r"[^a-z0-9]+")
+
+
+def _fast_slug(text: str) -> str:
+    """Slugify text, skipping python-slugify for plain ASCII titles."""
+    if _SLUG_SAFE_RE.fullmatch(text):
+        return _SLUG_SEPARATOR_RE.sub("-", text.lower()).strip("-")
+    return slugify(text)
 
 
 def _html_url_for(path: str) -> str:
@@ -56,46 +235,284 @@ def _html_url_for(path: str) -> str:
     return f"https://github.com/{GITHUB_REPO}/blob/main/{path}"
 
 
-def _get_file_content(path: str) -> str | None:
-    """Return the decoded text content of a file, or None if it doesn't exist."""
+def _rate_limit_delay(resp: httpx.Response) -> float | None:
+    """Return how long to wait before retrying a rate-limited response.
+
+    Returns None if the response wasn't rate limited.
+    """
+    if resp.status_code not in (403, 429):
+        return None
+
+    retry_after = resp.headers.get("Retry-After")
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            return None
+
+    if resp.headers.get("x-ratelimit-remaining") == "0":
+        try:
+            reset = float(resp.headers["x-ratelimit-reset"])
+        except (KeyError, ValueError):
+            return None
+        return max(reset - time.time(), 0) + 1
+    return None
+
+
+async def _github_request(method: str, url: str, **kwargs) -> httpx.Response:
+    """Send a GitHub API request and return the response.
+
+    GET requests are retried on transient gateway errors and, when the wait
+    is short enough, after rate-limit responses. Error responses are raised
+    as GithubException so callers can inspect ``status`` and ``data``.
+    """
+    attempts = _MAX_ATTEMPTS if method == "GET" else 1
+    for attempt in range(attempts):
+        async with _request_slots:
+            resp = await _gh_client.request(method, url, **kwargs)
+        if attempt == attempts - 1:
+            break
+
+        if resp.status_code in _RETRY_STATUSES:
+            delay = 0.3 * 2**attempt
+        else:
+            delay = _rate_limit_delay(resp)
+            if delay is None or delay > _MAX_RATE_LIMIT_WAIT:
+                break
+        await asyncio.sleep(delay)
+
+    if resp.status_code >= 400:
+        try:
+            data = resp.json()
+        except ValueError:
+            data = {"message": resp.text}
+        if not isinstance(data, dict):
+            data = {"message": resp.text}
+        raise GithubException(resp.status_code, data, dict(resp.headers))
+    return resp
+
+
+async def _fetch_raw_file(path: str, ref: str = "main") -> bytes | None:
+    """Return the raw bytes of a file at ref, or None if it doesn't exist.
+
+    Uses the raw media type so the body needs no base64 decoding, and
+    revalidates against the stored ETag so unchanged files aren't
+    re-downloaded.
+    """
+    stored = _etag_store.get(path)
+    headers = {"Accept": "application/vnd.github.raw"}
+    if stored:
+        headers["If-None-Match"] = stored[0]
+
     try:
-        contents = _repo.get_contents(path, ref="main")
-        return contents.decoded_content.decode("utf-8")
+        resp = await _github_request(
+            "GET",
+            f"/repos/{GITHUB_REPO}/contents/{path}",
+            params={"ref": ref},
+            headers=headers,
+        )
     except GithubException as exc:
         if exc.status == 404:
+            _etag_store.pop(path, None)
             return None
         raise
 
+    if resp.status_code == 304 and stored is not None:
+        return stored[1]
+
+    etag = resp.headers.get("ETag")
+    if etag:
+        _etag_store[path] = (etag, resp.content)
+    return resp.content
+
 
-def _create_or_update_file(path: str, content: str, message: str) -> str:
+async def _fetch_sha(path: str) -> str | None:
+    """Return the current blob SHA of a file from GitHub, or None if it doesn't exist."""
+    try:
+        resp = await _github_request(
+            "GET",
+            f"/repos/{GITHUB_REPO}/contents/{path}",
+            params={"ref": "main"},
+        )
+    except GithubException as exc:
+        if exc.status == 404:
+            return None
+        raise
+    return resp.json()["sha"]
+
+
+async def _put_file(
+    path: str, content: str | bytes, message: str, sha: str | None
+) -> dict:
+    """Update the file at path if a SHA is given, otherwise create it."""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    payload = {
+        "message": message,
+        "content": base64.b64encode(content).decode("ascii"),
+        "branch": "main",
+    }
+    if sha is not None:
+        payload["sha"] = sha
+
+    resp = await _github_request(
+        "PUT", f"/repos/{GITHUB_REPO}/contents/{path}", json=payload
+    )
+    return resp.json()
+
+
+async def _create_or_update_file(
+    path: str, content: str | bytes, message: str
+) -> str:
     """Create or update a file in the repo and return its browser URL.
 
+    The write is sent optimistically using the last known SHA for the path
+    (or as a new file); the SHA is only re-fetched if GitHub rejects it.
+
     Returns the GitHub URL of the created/updated file.
     """
-    existing = None
+    sha = _sha_cache.get(path)
+
     try:
-        existing = _repo.get_contents(path, ref="main")
+        result = await _put_file(path, content, message, sha)
     except GithubException as exc:
-        if exc.status != 404:
+        if exc.status == 404 and sha is not None:
+            # The file was removed since we last saw it
+            result = await _put_file(path, content, message, None)
+        elif exc.status in (409, 422):
+            # Missing or stale SHA: refresh it once and retry
+            result = await _put_file(path, content, message, await _fetch_sha(path))
+        else:
             raise
 
+    _remember_sha(path, result["content"]["sha"])
+    _invalidate_cached(path)
+    return _html_url_for(path)
+
+
+async def _append_index_line(
+    path: str, heading: str, line: str, ref: str
+) -> tuple[str, bool]:
+    """Return the content of a markdown index at ref with line appended.
+
+    If the index doesn't exist yet, it is started under heading. Returns
+    (content, created) where created is True for a new index file.
+    """
+    existing = await _fetch_raw_file(path, ref)
+    new_line = f"{line}\n"
+
     if existing is not None:
-        _repo.update_file(
-            path=path,
-            message=message,
-            content=content,
-            sha=existing.sha,
-            branch="main",
-        )
+        updated = existing.decode("utf-8").rstrip("\n") + "\n" + new_line
     else:
-        _repo.create_file(
-            path=path,
-            message=message,
-            content=content,
-            branch="main",
+        updated = f"# {heading}\n\n" + new_line
+    return updated, existing is None
+
+
+async def _get_main_head() -> tuple[str, str]:
+    """Return the (commit sha, tree sha) that main currently points at."""
+    repo_url = f"/repos/{GITHUB_REPO}"
+    ref_resp = await _github_request("GET", f"{repo_url}/git/ref/heads/main")
+    commit_sha = ref_resp.json()["object"]["sha"]
+    commit_resp = await _github_request("GET", f"{repo_url}/git/commits/{commit_sha}")
+    return commit_sha, commit_resp.json()["tree"]["sha"]
+
+
+async def _commit_files(
+    files: dict[str, str], message: str, parent_sha: str, base_tree_sha: str
+) -> None:
+    """Write several files to main in a single commit via the Git Data API.
+
+    The commit is built on parent_sha, which must be the commit the file
+    contents were derived from. The blobs are created inline as part of the
+    new tree, so the whole commit costs a fixed number of requests however
+    many files it touches.
+    """
+    repo_url = f"/repos/{GITHUB_REPO}"
+    tree_resp = await _github_request(
+        "POST",
+        f"{repo_url}/git/trees",
+        json={
+            "base_tree": base_tree_sha,
+            "tree": [
+                {"path": path, "mode": "100644", "type": "blob", "content": content}
+                for path, content in files.items()
+            ],
+        },
+    )
+    commit_resp = await _github_request(
+        "POST",
+        f"{repo_url}/git/commits",
+        json={
+            "message": message,
+            "tree": tree_resp.json()["sha"],
+            "parents": [parent_sha],
+        },
+    )
+    # Not forced: if main moved past parent_sha, GitHub rejects the update
+    # as not a fast forward instead of dropping the other commit
+    await _github_request(
+        "PATCH",
+        f"{repo_url}/git/refs/heads/main",
+        json={"sha": commit_resp.json()["sha"]},
+    )
+
+    for path in files:
+        _invalidate_cached(path)
+
+
+def _format_snippet(text: str, truncated: bool) -> str:
+    """Collapse the first 200 characters of text into a one-line snippet."""
+    snippet = text[:200].replace("\n", " ").strip()
+    if truncated:
+        snippet += "..."
+    return snippet
+
+
+def _snippet_from_matches(item: dict) -> str | None:
+    """Build a snippet from a search hit's text_matches, or None if it has none."""
+    fragment = " ".join(
+        match["fragment"]
+        for match in item.get("text_matches") or []
+        if match.get("fragment")
+    )
+    if not fragment:
+        return None
+    return _format_snippet(fragment, len(fragment) > 200)
+
+
+async def _fetch_snippet(path: str) -> str:
+    """Return a short content snippet for a file by fetching its contents.
+
+    Failures are reported as a placeholder so one bad file doesn't abort
+    the whole search.
+    """
+    try:
+        resp = await _github_request(
+            "GET",
+            f"/repos/{GITHUB_REPO}/contents/{path}",
+            params={"ref": "main"},
         )
+        file_content = resp.json()
+        encoded_body = file_content.get("content")
+        # Files over 1 MB come back with encoding "none" and no inline content
+        if file_content.get("encoding") != "base64" or not encoded_body:
+            return "(unable to retrieve snippet)"
+
+        if file_content["size"] > 1024:
+            # Only decode enough of the base64 body to cover 200 characters
+            # (at most 800 bytes of UTF-8). GitHub wraps base64 at 60 columns,
+            # so strip newlines from a slightly longer slice first.
+            encoded = encoded_body[:1200].replace("\n", "")[:1068]
+            decoded = base64.b64decode(encoded).decode("utf-8", errors="ignore")
+            truncated = True
+        else:
+            decoded = base64.b64decode(encoded_body).decode("utf-8")
+            truncated = len(decoded) > 200
+    except Exception:
+        return "(unable to retrieve snippet)"
 
-    return _html_url_for(path)
+    # Show the first 200 characters as a snippet
+    return _format_snippet(decoded, truncated)
 
 
 # ---------------------------------------------------------------------------
@@ -104,7 +521,7 @@ def _create_or_update_file(path: str, content: str, message: str) -> str:
 
 
 @mcp.tool()
-def add_til(title: str, content: str, tags: list[str]) -> str:
+async def add_til(title: str, content: str, tags: list[str]) -> str:
     """Create a 'Today I Learned' entry in the knowledge base.
 
     Args:
@@ -117,41 +534,52 @@ def add_til(title: str, content: str, tags: list[str]) -> str:
     """
     try:
         date_str = _today()
-        slug = slugify(title)
+        slug = _fast_slug(title)
         filename = f"{date_str}-{slug}.md"
         file_path = f"til/{filename}"
 
         tags_yaml = ", ".join(tags) if tags else ""
-        frontmatter = (
-            "---\n"
-            f"title: \"{title}\"\n"
-            f"date: {date_str}\n"
-            f"tags: [{tags_yaml}]\n"
-            "---\n\n"
+        frontmatter = _TIL_FM.format_map(
+            {"title": title, "date": date_str, "tags": tags_yaml}
         )
         full_content = frontmatter + content + "\n"
 
-        url = _create_or_update_file(
-            path=file_path,
-            content=full_content,
-            message=f"Add TIL: {title}",
+        files = {file_path: full_content}
+
+        # Read the indexes at a fixed commit and build on that same commit,
+        # so a concurrent update makes the final ref update fail instead of
+        # being overwritten
+        parent_sha, base_tree_sha = await _get_main_head()
+
+        # Link the entry from this year's index shard so each update only
+        # rewrites one year's worth of entries
+        year = date_str[:4]
+        shard_name = f"index-{year}.md"
+        shard_path = f"til/{shard_name}"
+        files[shard_path], new_shard = await _append_index_line(
+            path=shard_path,
+            heading=f"TIL Index {year}",
+            line=f"- [{title}]({filename}) ({date_str})",
+            ref=parent_sha,
         )
 
-        # Update til/index.md with a link to the new entry
-        index_path = "til/index.md"
-        existing_index = _get_file_content(index_path)
-        new_link = f"- [{title}]({filename}) ({date_str})\n"
-
-        if existing_index is not None:
-            updated_index = existing_index.rstrip("\n") + "\n" + new_link
-        else:
-            updated_index = f"# TIL Index\n\n{new_link}"
+        # The top-level index only links the shards, so it changes once a year
+        if new_shard:
+            files["til/index.md"], _ = await _append_index_line(
+                path="til/index.md",
+                heading="TIL Index",
+                line=f"- [{year}]({shard_name})",
+                ref=parent_sha,
+            )
 
-        _create_or_update_file(
-            path=index_path,
-            content=updated_index,
-            message=f"Update TIL index: add {title}",
+        # The entry and its index updates land in one commit
+        await _commit_files(
+            files,
+            message=f"Add TIL: {title}",
+            parent_sha=parent_sha,
+            base_tree_sha=base_tree_sha,
         )
+        url = _html_url_for(file_path)
 
         return f"TIL entry created: {title}\nURL: {url}"
 
@@ -162,7 +590,7 @@ def add_til(title: str, content: str, tags: list[str]) -> str:
 
 
 @mcp.tool()
-def add_prompt(name: str, category: str, content: str, description: str) -> str:
+async def add_prompt(name: str, category: str, content: str, description: str) -> str:
     """Save a reusable prompt to the knowledge base.
 
     Args:
@@ -179,25 +607,25 @@ def add_prompt(name: str, category: str, content: str, description: str) -> str:
         if category_lower not in VALID_PROMPT_CATEGORIES:
             return (
                 f"Invalid category '{category}'. "
-                f"Must be one of: {', '.join(sorted(VALID_PROMPT_CATEGORIES))}"
+                f"Must be one of: {_VALID_PROMPT_CATS_STR}"
             )
 
         date_str = _today()
-        slug = slugify(name)
+        slug = _fast_slug(name)
         filename = f"{slug}.md"
         file_path = f"ai/prompts/{category_lower}/{filename}"
 
-        frontmatter = (
-            "---\n"
-            f"name: \"{name}\"\n"
-            f"category: {category_lower}\n"
-            f"description: \"{description}\"\n"
-            f"date: {date_str}\n"
-            "---\n\n"
+        frontmatter = _PROMPT_FM.format_map(
+            {
+                "name": name,
+                "category": category_lower,
+                "description": description,
+                "date": date_str,
+            }
         )
         full_content = frontmatter + content + "\n"
 
-        url = _create_or_update_file(
+        url = await _create_or_update_file(
             path=file_path,
             content=full_content,
             message=f"Add prompt: {name} ({category_lower})",
@@ -212,7 +640,7 @@ def add_prompt(name: str, category: str, content: str, description: str) -> str:
 
 
 @mcp.tool()
-def add_pattern(
+async def add_pattern(
     name: str,
     category: str,
     problem: str,
@@ -236,30 +664,27 @@ def add_pattern(
         if category_lower not in VALID_PATTERN_CATEGORIES:
             return (
                 f"Invalid category '{category}'. "
-                f"Must be one of: {', '.join(sorted(VALID_PATTERN_CATEGORIES))}"
+                f"Must be one of: {_VALID_PATTERN_CATS_STR}"
             )
 
         date_str = _today()
-        slug = slugify(name)
+        slug = _fast_slug(name)
         filename = f"{slug}.md"
         file_path = f"patterns/{category_lower}/{filename}"
 
         tags_yaml = ", ".join(tags) if tags else ""
-        frontmatter = (
-            "---\n"
-            f"name: \"{name}\"\n"
-            f"category: {category_lower}\n"
-            f"date: {date_str}\n"
-            f"tags: [{tags_yaml}]\n"
-            "---\n\n"
-        )
-        body = (
-            f"## Problem\n\n{problem}\n\n"
-            f"## Solution\n\n{solution}\n"
+        frontmatter = _PATTERN_FM.format_map(
+            {
+                "name": name,
+                "category": category_lower,
+                "date": date_str,
+                "tags": tags_yaml,
+            }
         )
+        body = _PATTERN_BODY.format_map({"problem": problem, "solution": solution})
         full_content = frontmatter + body
 
-        url = _create_or_update_file(
+        url = await _create_or_update_file(
             path=file_path,
             content=full_content,
             message=f"Add pattern: {name} ({category_lower})",
@@ -274,7 +699,7 @@ def add_pattern(
 
 
 @mcp.tool()
-def search_pkb(query: str) -> str:
+async def search_pkb(query: str) -> str:
     """Search the knowledge base by keyword.
 
     Args:
@@ -286,32 +711,34 @@ def search_pkb(query: str) -> str:
     """
     try:
         search_query = f"{query} repo:{GITHUB_REPO}"
-        results = _gh.search_code(search_query)
+        # The text-match media type returns matching fragments inline, so
+        # snippets normally need no follow-up requests. Only the first page,
+        # sized to the result cap, is requested.
+        resp = await _github_request(
+            "GET",
+            "/search/code",
+            params={"q": search_query, "per_page": MAX_SEARCH_RESULTS},
+            headers={"Accept": "application/vnd.github.text-match+json"},
+        )
+        items = resp.json().get("items", [])[:MAX_SEARCH_RESULTS]
+        snippets = [_snippet_from_matches(item) for item in items]
+
+        # Fall back to fetching the file for hits without text matches
+        missing = [i for i, snippet in enumerate(snippets) if snippet is None]
+        if missing:
+            fetched = await asyncio.gather(
+                *(_fetch_snippet(items[i]["path"]) for i in missing)
+            )
+            for i, snippet in zip(missing, fetched):
+                snippets[i] = snippet
 
         matches: list[str] = []
-        for item in results:
-            # Fetch a snippet of the file content
-            try:
-                file_content = item.repository.get_contents(
-                    item.path, ref="main"
-                )
-                decoded = file_content.decoded_content.decode("utf-8")
-                # Show the first 200 characters as a snippet
-                snippet = decoded[:200].replace("\n", " ").strip()
-                if len(decoded) > 200:
-                    snippet += "..."
-            except Exception:
-                snippet = "(unable to retrieve snippet)"
-
-            url = _html_url_for(item.path)
+        for item, snippet in zip(items, snippets):
+            url = _html_url_for(item["path"])
             matches.append(
-                f"- **{item.path}**\n  URL: {url}\n  Snippet: {snippet}"
+                f"- **{item['path']}**\n  URL: {url}\n  Snippet: {snippet}"
             )
 
-            # Cap at 20 results to keep output manageable
-            if len(matches) >= 20:
-                break
-
         if not matches:
             return f"No results found for '{query}'."
 
@@ -325,7 +752,7 @@ def search_pkb(query: str) -> str:
 
 
 @mcp.tool()
-def list_entries(section: str) -> str:
+async def list_entries(section: str) -> str:
     """List entries in a section of the knowledge base.
 
     Args:
@@ -340,7 +767,7 @@ def list_entries(section: str) -> str:
         if section_lower not in VALID_SECTIONS:
             return (
                 f"Invalid section '{section}'. "
-                f"Must be one of: {', '.join(sorted(VALID_SECTIONS))}"
+                f"Must be one of: {_VALID_SECTIONS_STR}"
             )
 
         if section_lower == "all":
@@ -348,37 +775,10 @@ def list_entries(section: str) -> str:
         else:
             sections_to_list = [section_lower]
 
-        output_parts: list[str] = []
-
-        for sec in sections_to_list:
-            repo_path = SECTION_PATH_MAP[sec]
-            header = f"## {sec.title()}\n"
-            entries: list[str] = []
-
-            try:
-                items = _list_files_recursive(repo_path)
-            except GithubException as exc:
-                if exc.status == 404:
-                    output_parts.append(header + "  (no entries yet)\n")
-                    continue
-                raise
-
-            if not items:
-                output_parts.append(header + "  (no entries yet)\n")
-                continue
-
-            for item_path, item_name in items:
-                # Fetch last commit date for the file
-                mod_date = _get_last_modified(item_path)
-                url = _html_url_for(item_path)
-                entries.append(
-                    f"- **{item_name}**\n"
-                    f"  Path: {item_path}\n"
-                    f"  Modified: {mod_date}\n"
-                    f"  URL: {url}"
-                )
-
-            output_parts.append(header + "\n".join(entries) + "\n")
+        # Sections share no state, so walk them concurrently
+        output_parts = await asyncio.gather(
+            *(_render_section(sec) for sec in sections_to_list)
+        )
 
         return "\n".join(output_parts).strip()
 
@@ -388,40 +788,136 @@ def list_entries(section: str) -> str:
         return f"Error listing entries: {exc}"
 
 
-def _list_files_recursive(path: str) -> list[tuple[str, str]]:
-    """Recursively list all files under a repo path.
+async def _render_section(sec: str) -> str:
+    """Render the listing for a single section as a markdown block."""
+    repo_path = SECTION_PATH_MAP[sec]
+    header = f"## {sec.title()}\n"
+    entries: list[str] = []
 
-    Returns a list of (path, name) tuples.
-    """
-    results: list[tuple[str, str]] = []
     try:
-        contents = _repo.get_contents(path, ref="main")
+        items = await _list_files_recursive(repo_path)
+    except GithubException as exc:
+        if exc.status == 404:
+            return header + "  (no entries yet)\n"
+        raise
+
+    if not items:
+        return header + "  (no entries yet)\n"
+
+    # Fetch last commit dates for all files concurrently; a failed lookup
+    # shows as 'unknown' without affecting the others
+    dates = await asyncio.gather(
+        *(_get_last_modified(item_path) for item_path, _ in items),
+        return_exceptions=True,
+    )
+
+    for (item_path, item_name), mod_date in zip(items, dates):
+        if isinstance(mod_date, Exception):
+            mod_date = "unknown"
+        url = _html_url_for(item_path)
+        entries.append(
+            f"- **{item_name}**\n"
+            f"  Path: {item_path}\n"
+            f"  Modified: {mod_date}\n"
+            f"  URL: {url}"
+        )
+
+    return header + "\n".join(entries) + "\n"
+
+
+@_cached(key=lambda path: (path.rstrip("/"), "dir"))
+async def _list_directory(path: str) -> list[dict]:
+    """Return the entries of a single repo directory, or [] if it doesn't exist."""
+    try:
+        resp = await _github_request(
+            "GET",
+            f"/repos/{GITHUB_REPO}/contents/{path}",
+            params={"ref": "main"},
+        )
     except GithubException as exc:
         if exc.status == 404:
-            return results
+            return []
         raise
 
-    # get_contents returns a list when path is a directory
+    # The contents API returns a list when path is a directory
+    contents = resp.json()
     if not isinstance(contents, list):
         contents = [contents]
+    return contents
 
-    for item in contents:
-        if item.type == "dir":
-            results.extend(_list_files_recursive(item.path))
-        else:
-            results.append((item.path, item.name))
+
+@_cached(key=lambda: _TREE_CACHE_KEY)
+async def _get_tree_cached() -> list[dict] | None:
+    """Return every entry in the main branch tree, fetched in a single request.
+
+    Returns None if the tree can't be listed in one go (missing, empty or
+    truncated by GitHub).
+    """
+    try:
+        resp = await _github_request(
+            "GET",
+            f"/repos/{GITHUB_REPO}/git/trees/main",
+            params={"recursive": "1"},
+        )
+    except GithubException as exc:
+        if exc.status in (404, 409):
+            return None
+        raise
+
+    tree = resp.json()
+    if tree.get("truncated"):
+        return None
+    return tree["tree"]
+
+
+async def _list_files_recursive(path: str) -> list[tuple[str, str]]:
+    """Recursively list all files under a repo path.
+
+    Uses the cached recursive branch tree when available, otherwise walks the
+    directories breadth-first, fetching each level concurrently.
+
+    Returns a list of (path, name) tuples.
+    """
+    tree = await _get_tree_cached()
+    if tree is not None:
+        prefix = path.rstrip("/") + "/"
+        return [
+            (element["path"], element["path"].rsplit("/", 1)[-1])
+            for element in tree
+            if element["type"] == "blob" and element["path"].startswith(prefix)
+        ]
+
+    results: list[tuple[str, str]] = []
+    pending = [path]
+
+    while pending:
+        subdirs: list[str] = []
+        levels = await asyncio.gather(*(_list_directory(p) for p in pending))
+        for contents in levels:
+            for item in contents:
+                if item["type"] == "dir":
+                    subdirs.append(item["path"])
+                else:
+                    results.append((item["path"], item["name"]))
+        pending = subdirs
 
     return results
 
 
-def _get_last_modified(path: str) -> str:
-    """Return the date of the most recent commit touching a file, or 'unknown'."""
-    try:
-        commits = _repo.get_commits(path=path, sha="main")
-        first = commits[0]
-        return first.commit.committer.date.strftime("%Y-%m-%d")
-    except Exception:
-        return "unknown"
+@_cached(key=lambda path: (path, "commits"))
+async def _get_last_modified(path: str) -> str:
+    """Return the date of the most recent commit touching a file.
+
+    Raises on failure so errors aren't cached; _render_section shows them
+    as 'unknown'.
+    """
+    # Only the newest commit is needed, so ask for a single-item page
+    resp = await _github_request(
+        "GET",
+        f"/repos/{GITHUB_REPO}/commits",
+        params={"path": path, "sha": "main", "per_page": 1},
+    )
+    return resp.json()[0]["commit"]["committer"]["date"][:10]
 
 
 # ---------------------------------------------------------------------------